@@ -1,4 +1,14 @@
+import collections
+import concurrent.futures
+import copy
+import functools
+import math
+import os
 import pprint
+import random
+import re
+import select
+import socket
 import struct
 import subprocess
 import sys
@@ -8,16 +18,31 @@ import traceback
 import urllib.parse
 import urllib.response
 import xml.etree.ElementTree
-from typing import Dict, List, Literal, Tuple, Union, Unpack, get_type_hints, Set
+import xml.sax.saxutils
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Set,
+    Tuple,
+    Union,
+    Unpack,
+    get_type_hints,
+)
 
 import defusedxml.ElementTree
 import requests
+import requests.adapters
 import upnpy.ssdp.SSDPDevice
 import upnpy.utils
 import zmq
 from didl_lite import didl_lite
 
-from LumixG9IIRemoteControl.helpers import get_local_ip
+from LumixG9IIRemoteControl.helpers import get_cache_dir, get_local_ip
 from LumixG9IIRemoteControl.http_event_consumer import HTTPRequestHandler, Server
 
 from .camera_types import (
@@ -31,36 +56,259 @@ from .camera_types import (
 )
 from .configure_logging import logger
 
+# keys accepted by cam.cgi, optionally prefixed with "cmd_" as in allmenu.xml, in the
+# order they are sent
+_CAMCGI_KEYS = tuple(get_type_hints(CamCGISettingDict).keys())
+
+# Content-Type headers of XML answers of the camera
+_XML_CONTENT_TYPES = frozenset({"text/xml", "xml"})
+
+# published message types, for which only the latest message is of interest
+_COALESCED_PUBLISH_TYPES = frozenset(
+    {"state_dict", "curmenu_etree", "allmenu_etree", "lens_dict", "setsettings"}
+)
+
+# published message types with an xml Element as data. These are sent as serialized
+# xml, which is about twice as fast and half the size as pickling the Element.
+XML_PUBLISH_TYPES = frozenset({"curmenu_etree", "allmenu_etree"})
+
+# map drag events from StreamViewer to values of camctrl touch_trace
+_DRAG_VALUES = {
+    "drag_start": "start",
+    "drag_continue": "continue",
+    "drag_stop": "stop",
+}
+
+# settings in get_setsetting_commands(), which can be set but not queried
+_WRITE_ONLY_SETTINGS = frozenset(
+    {"liveviewsize", "recmode", "videoquality_filter", "photostyle"}
+)
+
+# settings which can be queried but are not listed by get_setsetting_commands()
+# play_sort_mode can be file_no or date
+_SETTINGS_NOT_IN_SETSETTING_COMMANDS = (
+    "play_sort_mode",
+    "qmenu_disp_style",
+    "photostyle2",
+    "current_sd",
+)
+
+SSDP_ADDRESS = ("239.255.255.250", 1900)
+
+# The camera announces itself as media server. Searching for this type only, instead
+# of ssdp:all, avoids answers from all other UPnP devices in the network.
+SSDP_SEARCH_TARGET = "urn:schemas-upnp-org:device:MediaServer:1"
+
+_SSDP_LOCATION_RE = re.compile(rb"^location:[ \t]*(\S+)", re.IGNORECASE | re.MULTILINE)
+
+
+def ssdp_search(
+    search_target: str = SSDP_SEARCH_TARGET,
+    mx: int = 1,
+    timeout: float = 1.5,
+    repeat: int = 3,
+    repeat_interval: float = 0.2,
+) -> Set[str]:
+    """
+    Send an SSDP M-SEARCH and collect the LOCATION headers of all answers.
+
+    Parameters
+    ----------
+    search_target: str
+        Value of the ST header.
+    mx: int
+        Maximum time in seconds devices may wait before answering.
+    timeout: float
+        Time in seconds to wait for answers.
+    repeat: int
+        Number of times the search is sent, as UDP might get lost.
+    repeat_interval: float
+        Time in seconds between two searches.
+    """
+    message = (
+        "M-SEARCH * HTTP/1.1\r\n"
+        f"HOST: {SSDP_ADDRESS[0]}:{SSDP_ADDRESS[1]}\r\n"
+        'MAN: "ssdp:discover"\r\n'
+        f"MX: {mx:d}\r\n"
+        f"ST: {search_target}\r\n"
+        "\r\n"
+    ).encode()
+
+    locations = set()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        # UDP might get lost, thus repeat the search spaced out in time, while
+        # answers to earlier searches are already received. Answers are
+        # deduplicated by their location.
+        n_sent = 0
+        next_send = time.monotonic()
+        deadline = next_send + timeout
+        while (remaining := deadline - (now := time.monotonic())) > 0:
+            if n_sent < repeat:
+                if now >= next_send:
+                    sock.sendto(message, SSDP_ADDRESS)
+                    n_sent += 1
+                    next_send = now + repeat_interval
+                remaining = min(remaining, max(0, next_send - now))
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if readable:
+                data, _ = sock.recvfrom(65507)
+                if match := _SSDP_LOCATION_RE.search(data):
+                    locations.add(match.group(1).decode())
+    return locations
+
+
+# The GUI searches continuously and gets the same few locations over and over
+@functools.lru_cache(maxsize=256)
+def _lumix_hostname_from_location(location: str) -> Union[str, None]:
+    split = urllib.parse.urlsplit(location)
+    if split.path == "/Lumix/Server0/ddd":
+        return split.hostname
+    return None
+
 
 def find_lumix_cameras_via_sspd(
     return_hostname: bool = True,
 ) -> Set[Union[str, upnpy.ssdp.SSDPDevice.SSDPDevice]]:
     logger.info('Starting SSPD device discovery')
+    hostnames = set()
+    if return_hostname:
+        for location in ssdp_search():
+            if hostname := _lumix_hostname_from_location(location):
+                hostnames.add(hostname)
+        return hostnames
+
+    # device objects are only provided by upnpy's full discovery
     upnp = upnpy.UPnP()
     devices = upnp.discover()
-    hostnames = set()
     for device in devices:
         split = urllib.parse.urlsplit(
             upnpy.utils.parse_http_header(device.response, "Location")
         )
         if split.path == "/Lumix/Server0/ddd":
-            if return_hostname:
-                hostnames.add(split.hostname)
-            else:
-                hostnames.add(device)
+            hostnames.add(device)
     return hostnames
 
-def find_lumix_camera_via_sspd(**kwargs):
+
+def _last_host_filename() -> str:
+    # creates the cache directory, thus call it where OSError is handled
+    return os.path.join(get_cache_dir(), "last_host.txt")
+
+
+def _load_last_host() -> Union[str, None]:
+    try:
+        with open(_last_host_filename(), "r") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _save_last_host(host: str):
+    try:
+        with open(_last_host_filename(), "w") as f:
+            f.write(host)
+    except OSError as e:
+        logger.warning("Could not cache camera host: %s", e)
+
+
+def _is_lumix_camera(
+    host: str, session: requests.Session, timeout: float = 0.5
+) -> bool:
+    try:
+        ret = session.get(f"http://{host}:60606/Lumix/Server0/ddd", timeout=timeout)
+        if not ret.ok:
+            return False
+        # host is not yet known to be a camera, thus parse defensively
+        device = defusedxml.ElementTree.fromstring(ret.content).find(
+            "{urn:schemas-upnp-org:device-1-0}device"
+        )
+    except (requests.RequestException, xml.etree.ElementTree.ParseError, ValueError):
+        return False
+    if device is None:
+        return False
+    manufacturer = device.findtext("{urn:schemas-upnp-org:device-1-0}manufacturer")
+    model_name = device.findtext("{urn:schemas-upnp-org:device-1-0}modelName")
+    return bool(manufacturer and manufacturer.startswith("Panasonic") and model_name)
+
+
+def find_lumix_camera_via_sspd(probe_session: requests.Session = None, **kwargs):
+    """
+    Returns the single camera in the network.
+
+    Parameters
+    ----------
+    probe_session:
+        If given, the camera found last time is probed first through this session,
+        which is much faster than a SSDP discovery. Then, other cameras in the
+        network are not noticed, thus only pass it if any camera is fine.
+    """
+    return_hostname = kwargs.get("return_hostname", True)
+    if return_hostname and probe_session is not None:
+        host = _load_last_host()
+        if host is not None and _is_lumix_camera(host, probe_session):
+            logger.info("Found camera at last known host %s", host)
+            return host
 
     hostnames = find_lumix_cameras_via_sspd(**kwargs)
     if len(hostnames) == 0:
         raise RuntimeError("No camera found")
     elif len(hostnames) == 1:
-        return hostnames.pop()
+        host = hostnames.pop()
+        if return_hostname:
+            _save_last_host(host)
+        return host
     else:
         raise ValueError(f"Multiple candidates found: {hostnames}.")
 
 
+# The envelope is fixed except for a few values, thus it is formatted from a template
+# instead of being built and serialized as element tree for every page.
+_CDS_BROWSE_TEMPLATE = """\
+<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" \
+s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">
+ <s:Body>
+  <u:Browse xmlns:u="urn:schemas-upnp-org:service:ContentDirectory:1" \
+xmlns:pana="urn:schemas-panasonic-com:pana">
+   <ObjectID>{object_id}</ObjectID>
+   <BrowseFlag>BrowseDirectChildren</BrowseFlag>
+   <Filter>*</Filter>
+   <StartingIndex>{starting_index:d}</StartingIndex>
+   <RequestedCount>{requested_count:d}</RequestedCount>
+   <SortCriteria></SortCriteria>
+   <pana:X_FromCP>LumixLink2.0</pana:X_FromCP>
+{optional_elements}\
+  </u:Browse>
+ </s:Body>
+</s:Envelope>"""
+_CDS_BROWSE_RECGROUP_TEMPLATE = "   <pana:X_RecGroupType>{}</pana:X_RecGroupType>\n"
+_CDS_BROWSE_FILTER_TEMPLATE = (
+    "   <pana:X_Filter>{}</pana:X_Filter>\n"
+    "   <pana:X_Order>type=date,value=ascend</pana:X_Order>\n"
+)
+
+_CDS_CONTROL_URL = "http://{host}:60606/Server0/CDS_control"
+# must not be modified, as it is shared by all browse requests
+_CDS_BROWSE_HEADERS = {
+    "User-Agent": "Panasonic Android/1 DM-CP",
+    "Content-Type": 'text/xml charset="utf-8"',
+    "SOAPACTION": '"urn:schemas-upnp-org:service:ContentDirectory:1#Browse"',
+}
+
+
+# all pages of a bulk query share the same filter, thus build it once
+@functools.lru_cache(maxsize=32)
+def _cds_filter_string(age_in_days: int = None, rating_list: Tuple[int] = None) -> str:
+    filter_list = []
+    if age_in_days:
+        filter_list.append(f"type=date,value=relative,value2={age_in_days:d}")
+    if rating_list:
+        rating_string = "/".join([str(rating) for rating in rating_list])
+        filter_list.append(f"type=rating,value={rating_string}")
+    return ";".join(filter_list)
+
+
 def prepare_cds_query(
     host: str,
     StartingIndex=0,
@@ -94,71 +342,70 @@ def prepare_cds_query(
         Once Lumix Sync requested it, i can connect with this script an get container id too.
     """
 
-    filter_list = []
-    if age_in_days:
-        filter_list.append(f"type=date,value=relative,value2={age_in_days:d}")
-    if rating_list:
-        rating_string = "/".join(map(str, rating_list))
-        filter_list.append(f"type=rating,value={rating_string}")
-    filter_string = ";".join(filter_list)
-
-    envelop = xml.etree.ElementTree.Element(
-        "s:Envelope",
-        attrib={
-            "xmlns:s": "http://schemas.xmlsoap.org/soap/envelope/",
-            "s:encodingStyle": "http://schemas.xmlsoap.org/soap/encoding/",
-        },
-    )
-    body = xml.etree.ElementTree.SubElement(envelop, "s:Body")
-    browse = xml.etree.ElementTree.SubElement(
-        body,
-        "u:Browse",
-        attrib={
-            "xmlns:u": "urn:schemas-upnp-org:service:ContentDirectory:1",
-            "xmlns:pana": "urn:schemas-panasonic-com:pana",
-        },
+    filter_string = _cds_filter_string(
+        age_in_days, tuple(rating_list) if rating_list else None
     )
-    xml.etree.ElementTree.SubElement(browse, "ObjectID").text = object_id_str
-    xml.etree.ElementTree.SubElement(browse, "BrowseFlag").text = "BrowseDirectChildren"
-    xml.etree.ElementTree.SubElement(browse, "Filter").text = "*"
-    xml.etree.ElementTree.SubElement(browse, "StartingIndex").text = str(
-        int(StartingIndex)
-    )
-    xml.etree.ElementTree.SubElement(browse, "RequestedCount").text = str(
-        int(RequestedCount)
-    )
-    xml.etree.ElementTree.SubElement(browse, "SortCriteria")
-    xml.etree.ElementTree.SubElement(browse, "pana:X_FromCP").text = "LumixLink2.0"
+
+    optional_elements = ""
     if recgroup_type_string is not None:
-        xml.etree.ElementTree.SubElement(browse, "pana:X_RecGroupType").text = (
-            recgroup_type_string
+        optional_elements += _CDS_BROWSE_RECGROUP_TEMPLATE.format(
+            xml.sax.saxutils.escape(recgroup_type_string)
         )
     if filter_string:
-        xml.etree.ElementTree.SubElement(browse, "pana:X_Filter").text = filter_string
-        xml.etree.ElementTree.SubElement(browse, "pana:X_Order").text = (
-            "type=date,value=ascend"
+        optional_elements += _CDS_BROWSE_FILTER_TEMPLATE.format(
+            xml.sax.saxutils.escape(filter_string)
         )
+    xml_string = _CDS_BROWSE_TEMPLATE.format(
+        object_id=xml.sax.saxutils.escape(object_id_str),
+        starting_index=int(StartingIndex),
+        requested_count=int(RequestedCount),
+        optional_elements=optional_elements,
+    ).encode("utf-8")
 
-    xml.etree.ElementTree.indent(envelop, space=" ")
-    xml_string = xml.etree.ElementTree.tostring(
-        envelop, xml_declaration=True, encoding="utf-8", short_empty_elements=False
-    )
-    xml_string = xml_string.replace(b"'", b'"')
-
-    url = f"http://{host}:60606/Server0/CDS_control"
-    headers = {
-        "User-Agent": "Panasonic Android/1 DM-CP",
-        "Content-Type": 'text/xml charset="utf-8"',
-        "SOAPACTION": '"urn:schemas-upnp-org:service:ContentDirectory:1#Browse"',
-    }
+    url = _CDS_CONTROL_URL.format(host=host)
 
     logger.info("%s", xml_string.decode())
-    return url, xml_string, headers
+    return url, xml_string, _CDS_BROWSE_HEADERS
+
+
+def _parse_xml(data: Union[str, bytes]) -> xml.etree.ElementTree.Element:
+    """
+    Parse an XML document received from the camera.
 
+    Pass bytes when possible, thus the encoding is taken from the XML declaration
+    instead of decoding the document beforehand.
 
-def decode_cds_query_response(text: str):
-    soap_xml = defusedxml.ElementTree.fromstring(text)
-    didl_lite_xml = defusedxml.ElementTree.fromstring(soap_xml.find(".//Result").text)
+    The camera is trusted once connected, thus the C parser of the standard library
+    is used, which is about 2.5 times faster than defusedxml for allmenu.
+    """
+    return xml.etree.ElementTree.fromstring(data)
+
+
+def _parse_xml_chunks(chunks: Iterable[bytes]) -> xml.etree.ElementTree.Element:
+    """
+    Like `_parse_xml()`, but feed the document to the parser piece by piece, e.g.
+    from `requests.Response.iter_content()`, thus parsing overlaps with receiving.
+    """
+    parser = xml.etree.ElementTree.XMLParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def decode_cds_query_response(
+    text: Union[str, bytes, xml.etree.ElementTree.Element],
+):
+    """
+    Parameters
+    ----------
+    text:
+        SOAP answer of a CDS browse request, either as document or already parsed.
+    """
+    if xml.etree.ElementTree.iselement(text):
+        soap_xml = text
+    else:
+        soap_xml = _parse_xml(text)
+    didl_lite_xml = _parse_xml(soap_xml.find(".//Result").text)
     didl_object_list = didl_lite.from_xml_el(didl_lite_xml)
     UpdateID = int(soap_xml.find(".//UpdateID").text)
     TotalMatches = int(soap_xml.find(".//TotalMatches").text)  # 123
@@ -189,13 +436,12 @@ def didl_split_protocol_info(resource: didl_lite.Resource):
         string = string
     protocol, network, contentFormat, additionalInfo = string.split(":")
 
-    key_value_strings = additionalInfo.split(";")
     additionalInfoDict = {}
-    for key_value_string in key_value_strings:
-        key, value = key_value_string.split("=")
+    for key_value_string in additionalInfo.split(";"):
+        key, _, value = key_value_string.partition("=")
         if key == "OriginalFileName":
             # strip extra quotes
-            value = value[1:-1]
+            value = value.strip("'\"")
         additionalInfoDict[key] = value
 
     return protocol, network, contentFormat, additionalInfoDict
@@ -245,8 +491,7 @@ def didl_object_list_to_camera_content_list(
         if container_thumb_uri := getattr(didl_object, "x__thumb_uri", None):
             camera_content_item["CAM_TN"] = container_thumb_uri
 
-        pprint.pprint("didl_object_list_to_camera_content_list")
-        pprint.pprint(camera_content_item)
+        logger.debug("camera content item %s", camera_content_item)
 
         # Container(id='01111980DIR', parent_id='0', restricted='0', title='111-1980', creator=None, res=[], write_status='WRITABLE', child_count='30', create_class=None, search_class=None, searchable=None, never_playable=None, x__rec_group_type='Interval', x__thumb_uri='http://192.168.7.211:50001/DT01111980.JPG', x__rating_num='0', x__rating='0', descriptors=[], children=[])
         lst.append(camera_content_item)
@@ -254,29 +499,256 @@ def didl_object_list_to_camera_content_list(
     return lst
 
 
+# keys for the accctrl handshake, which are XORed with the camera's challenge
+_ACCCTRL_VALUE_KEYS = (
+    892617780,
+    808663348,
+    808529965,
+    808529200,
+    942485552,
+    758198320,
+    809579056,
+    842018864,
+    942748980,
+)
+_ACCCTRL_VALUE_STRUCT = struct.Struct(f">{len(_ACCCTRL_VALUE_KEYS)}I")
+_ACCCTRL_VALUE2_KEY = 4281684038
+
+
 def hash_wifi(req_acc_g_str: str) -> Tuple[str, str]:
     req_acc_g_bytes = bytes.fromhex(req_acc_g_str)
     req_acc_g_int = struct.unpack("<I", req_acc_g_bytes)[0]
 
-    value = bytearray(36)
-    for i, x in enumerate(
-        [
-            892617780,
-            808663348,
-            808529965,
-            808529200,
-            942485552,
-            758198320,
-            809579056,
-            842018864,
-            942748980,
-        ]
+    value = _ACCCTRL_VALUE_STRUCT.pack(
+        *(req_acc_g_int ^ x for x in _ACCCTRL_VALUE_KEYS)
+    )
+    value2 = struct.pack(">I", req_acc_g_int ^ _ACCCTRL_VALUE2_KEY)
+
+    return value.hex(), value2.hex()
+
+
+def _decode_concurrent_handshake(
+    rets: List[requests.Response],
+) -> Union[List[List[str]], None]:
+    """
+    Returns the data of both answers to concurrently sent req_acc_e requests, the
+    one without a session id first. Returns None, unless both answers are "ok" and
+    exactly one of them carries the session id.
+    """
+    answers = []
+    for ret in rets:
+        if not ret.ok:
+            return None
+        state, _, rest = ret.content.decode("iso-8859-1").strip().partition(",")
+        if state != "ok":
+            return None
+        answers.append(rest.split(","))
+    # answers to concurrent requests can arrive in any order
+    answers.sort(key=len)
+    if [len(data) for data in answers] != [3, 4]:
+        return None
+    return answers
+
+
+def _build_extra_menu() -> (
+    Tuple[xml.etree.ElementTree.Element, List[xml.etree.ElementTree.Element]]
+):
+    """
+    Build menu items, which are not in allmenu xml, e.g. SD-card selection,
+    and their english titles.
+    """
+    extra_menu = xml.etree.ElementTree.Element("extra_menu")
+    menu = xml.etree.ElementTree.SubElement(extra_menu, "menu")
+    language_en = xml.etree.ElementTree.Element("language")
+
+    # add sd-card selection
+    item = xml.etree.ElementTree.SubElement(menu, "item")
+    item.set("id", "menu_item_id_sd")
+    item.set("title_id", "title_sdcard_select")
+    item.set("func_type", "select")
+    group = xml.etree.ElementTree.SubElement(item, "group")
+    title = xml.etree.ElementTree.SubElement(language_en, "title")
+    title.set("id", "title_sdcard_select")
+    title.text = "SD Card"
+    for i in (1, 2):
+        item = xml.etree.ElementTree.SubElement(group, "item")
+        title_id = f"title_sd_{i}"
+        item.set("id", f"menu_item_id_sd_{i}")
+        item.set("title_id", title_id)
+        item.set("cmd_mode", "setsetting")
+        item.set("cmd_type", "current_sd")
+        item.set("cmd_value", f"sd{i}")
+
+        title = xml.etree.ElementTree.SubElement(language_en, "title")
+        title.set("id", title_id)
+        title.text = f"SD Card {i}"
+
+    # add shutter speed
+    item = xml.etree.ElementTree.SubElement(menu, "item")
+    item.set("id", "menu_item_id_shtrspeed")
+    item.set("title_id", "Shutter Speed")
+    item.set("func_type", "select")
+    group = xml.etree.ElementTree.SubElement(item, "group")
+    for cmd_value, text in (
+        ("3840/256", "32000"),
+        ("3755/256", "25000"),
+        ("3670/256", "20000"),
+        ("3584/256", "16000"),
+        ("3499/256", "13000"),
+        ("3414/256", "10000"),
+        ("3328/256", "8000"),
+        ("3243/256", "6400"),
+        ("3158/256", "5000"),
+        ("3072/256", "4000"),
+        ("2987/256", "3200"),
+        ("2902/256", "2500"),
+        ("2816/256", "2000"),
+        ("2731/256", "1600"),
+        ("2646/256", "1300"),
+        ("2560/256", "1000"),
+        ("2475/256", "800"),
+        ("2390/256", "640"),
+        ("2304/256", "500"),
+        ("2219/256", "400"),
+        ("2134/256", "320"),
+        ("2048/256", "250"),
+        ("1963/256", "200"),
+        ("1878/256", "160"),
+        ("1792/256", "125"),
+        ("1707/256", "100"),
+        ("1622/256", "80"),
+        ("1536/256", "60"),
+        ("1451/256", "50"),
+        ("1366/256", "40"),
+        ("1280/256", "30"),
+        ("1195/256", "25"),
+        ("1110/256", "20"),
+        ("1024/256", "15"),
+        ("939/256", "13"),
+        ("854/256", "10"),
+        ("768/256", "8"),
+        ("683/256", "6"),
+        ("598/256", "5"),
+        ("512/256", "4"),
+        ("427/256", "3.2"),
+        ("342/256", "2.5"),
+        ("256/256", "2"),
+        ("171/256", "1.6"),
+        ("86/256", "1.3"),
+        ("0/256", "1"),
+        ("65451/256", "1.3s"),
+        ("65366/256", "1.6s"),
+        ("65280/256", "2s"),
+        ("65195/256", "2.5s"),
+        ("65110/256", "3.2s"),
+        ("65024/256", "4s"),
+        ("64939/256", "5s"),
+        ("64854/256", "6s"),
+        ("64768/256", "8s"),
+        ("64683/256", "10s"),
+        ("64598/256", "13s"),
+        ("64512/256", "15s"),
+        ("64427/256", "20s"),
+        ("64342/256", "25s"),
+        ("64256/256", "30s"),
+        ("64171/256", "40s"),
+        ("64086/256", "50s"),
+        ("64000/256", "60s"),
+        ("16384/256", "B"),
+    ):
+        item = xml.etree.ElementTree.SubElement(group, "item")
+        title_id = f"title_shtrspeed_{cmd_value}"
+        item.set("id", f"menu_item_id_shtrspeed_{cmd_value}")
+        item.set("title_id", title_id)
+        item.set("cmd_mode", "setsetting")
+        item.set("cmd_type", "shtrspeed")
+        item.set("cmd_value", cmd_value)
+
+        title = xml.etree.ElementTree.SubElement(language_en, "title")
+        title.set("id", title_id)
+        title.text = text
+
+    # add aperture
+    item = xml.etree.ElementTree.SubElement(menu, "item")
+    item.set("id", "menu_item_id_focal")
+    item.set("title_id", "Aperture")
+    item.set("func_type", "select")
+    group = xml.etree.ElementTree.SubElement(item, "group")
+    for cmd_value, text in (
+        ("164/256", "1.18"),
+        ("171/256", "1.2"),
+        ("256/256", "1.4"),
+        ("342/256", "1.6"),
+        ("392/256", "1.7"),
+        ("427/256", "1.8"),
+        ("512/256", "2"),
+        ("598/256", "2.2"),
+        ("683/256", "2.5"),
+        ("768/256", "2.8"),
+        ("854/256", "3.2"),
+        ("938/256", "3.5"),
+        ("1024/256", "4"),
+        ("1110/256", "4.5"),
+        ("1195/256", "5"),
+        ("1280/256", "5.6"),
+        ("1366/256", "6.3"),
+        ("1451/256", "7.1"),
+        ("1536/256", "8"),
+        ("1622/256", "9"),
+        ("1707/256", "10"),
+        ("1792/256", "11"),
+        ("1878/256", "13"),
+        ("1963/256", "14"),
+        ("2048/256", "16"),
+        ("2134/256", "18"),
+        ("2219/256", "20"),
+        ("2304/256", "22"),
     ):
-        value[i * 4 : (i + 4) * 4] = struct.pack(">I", req_acc_g_int ^ x)
+        item = xml.etree.ElementTree.SubElement(group, "item")
+        title_id = f"title_focal_{cmd_value}"
+        item.set("id", f"menu_item_id_focal_{cmd_value}")
+        item.set("title_id", title_id)
+        item.set("cmd_mode", "setsetting")
+        item.set("cmd_type", "focal")
+        item.set("cmd_value", cmd_value)
+
+        title = xml.etree.ElementTree.SubElement(language_en, "title")
+        title.set("id", title_id)
+        title.text = text
+
+    return extra_menu, list(language_en)
 
-    value2 = struct.pack(">I", req_acc_g_int ^ 4281684038)
 
-    return "".join([f"{x:02x}" for x in value]), "".join([f"{x:02x}" for x in value2])
+# extra menu is static, thus build it only once
+_EXTRA_MENU_ELEMENT, _EXTRA_MENU_TITLES_EN = _build_extra_menu()
+
+
+class _CameraHTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    HTTPAdapter for the long-lived connections to the camera.
+
+    Touch and drag requests are tiny, thus Nagle's algorithm must not delay them, and
+    keep-alive probes detect a camera that left the Wi-Fi while a connection idles in
+    the pool.
+    """
+
+    socket_options = [
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
+    # The first probe is sent after 2 hours of idling by default, which is too late
+    # to keep NAT entries and the camera's socket alive between bursts of requests.
+    # Not every platform allows tuning it.
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10))
+    if hasattr(socket, "TCP_KEEPCNT"):
+        socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3))
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault("socket_options", self.socket_options)
+        super().init_poolmanager(*args, **kwargs)
 
 
 class LumixG9IIWiFiControl:
@@ -303,10 +775,36 @@ class LumixG9IIWiFiControl:
         # Drag continue events can come from GUI more rapidly than Wi-Fi transport to
         # camera permits. Thus set a minimum interval and discard intermediate
         # coordinates.
-        self.min_drag_continue_interval: float = float(min_drag_continue_interval)
-        self._last_drag_continue_timestamp: float = None
-
-        self._headers = {"User-Agent": "LUMIX Sync", "Connection": "Keep-Alive"}
+        self.min_drag_continue_interval = float(min_drag_continue_interval)
+        self._last_drag_continue_ns: int = 0
+
+        # lcd_on is sent before every touch event from the stream viewer, but it only
+        # needs to be repeated, when the display might have been switched off in the
+        # meantime.
+        self.lcd_on_ttl: float = 5.0
+        self._lcd_on_until: float = 0
+
+        # Reuse TCP connections to the camera (HTTP keep-alive) instead of opening a
+        # new one for every request. Pool is sized for concurrent bulk requests.
+        self._session = requests.Session()
+        self._session.mount(
+            "http://",
+            _CameraHTTPAdapter(pool_connections=4, pool_maxsize=16),
+        )
+        # headers are sent with every request, X-SESSION_ID is added by connect()
+        self._session.headers.update(
+            {"User-Agent": "LUMIX Sync", "Connection": "Keep-Alive"}
+        )
+        self._headers = self._session.headers
+        # The camera is always reached directly. Not looking up proxy settings in the
+        # environment saves several 100 µs per request.
+        self._session.trust_env = False
+        # prepared cam.cgi request, which is copied for each command, as
+        # ((url, session id), request)
+        self._cam_cgi_template: Tuple[Tuple[str, str], requests.PreparedRequest] = (
+            None,
+            None,
+        )
 
         # caches for camera capabilities
         self._capability_tree: xml.etree.ElementTree.ElementTree = None
@@ -316,6 +814,14 @@ class LumixG9IIWiFiControl:
         self._external_teleconverter_tree: xml.etree.ElementTree.ElementTree = None
         self._touch_type_tree: xml.etree.ElementTree.ElementTree = None
         self._ddd_tree: xml.etree.ElementTree.ElementTree = None
+        self._setsetting_commands_cache: Dict[str, Dict] = None
+        # settings queried by get_settings() by default, derived from the commands
+        # cache, as (setsetting commands, settings)
+        self._default_settings_cache: Tuple[Dict[str, Dict], Tuple[str, ...]] = (
+            None,
+            (),
+        )
+        self._title_map: Dict[str, str] = {}
 
         # static camera parameters
         self.device_info_dict: Dict[str, str] = {}
@@ -335,10 +841,29 @@ class LumixG9IIWiFiControl:
         self._cam_not_busy.set()
         self._keepalive: bool = True
         self._state_thread: threading.Thread = None
+        self.state_poll_interval: float = 2
+        # set to poll the state right away, e.g. after a command changed it
+        self._state_refresh_requested = threading.Event()
+        self._last_published_state: Dict[str, str] = None
+        # an unchanged state is republished for receivers started later, e.g. the
+        # stream viewer
+        self.state_republish_interval: float = 10
+        self._last_state_publish_time: float = -math.inf
+        # raw answers of last getstate and curmenu queries to skip unchanged ones
+        self._last_state_body: bytes = None
+        self._last_curmenu_body: bytes = None
+        self._last_curmenu_sd_states: Tuple[str, str] = None
+
+        # number of requests sent concurrently for bulk queries
+        self.max_parallel_requests: int = 8
+        # many concurrent content directory queries make the camera refuse some
+        self.max_parallel_cds_requests: int = 4
 
         # parameters for retry behaviour is err_busy is returned by camera
         self.number_retry_if_busy: int = number_retry_if_busy
-        self.retry_busy_interval: float = 1
+        self.retry_busy_interval: float = 0.1  # first retry delay, doubled per retry
+        self.retry_busy_max_interval: float = 2
+        self.retry_busy_jitter: float = 0.05
 
         # handle to GUI
         self._stream_viewer_subprocess: subprocess.Popen = None
@@ -346,57 +871,153 @@ class LumixG9IIWiFiControl:
         # handles to thread capturing camera events
         self._http_server: Server = None
         self._event_thread: threading.Thread = None
+        # set while the server is listening for camera events
+        self._event_server_ready = threading.Event()
+        self.event_server_start_timeout: float = 5
+        # local ip, on which camera events are received, as (camera host, local ip)
+        self._local_ip: Tuple[str, str] = (None, None)
+
+        # Camera events come in bursts. Refreshes triggered by them are collected and
+        # run once, `event_refresh_delay` seconds after the last event of a burst.
+        self.event_refresh_delay: float = 0.2
+        self._event_refresh_lock = threading.Lock()
+        self._event_refresh_timer: threading.Timer = None
+        self._pending_lens_refresh: bool = False
+        self._pending_settings_refresh: bool = False
 
         self._cds_query_counter = 0
 
         self._zmq_context = zmq.Context()
         self._zmq_socket = self._zmq_context.socket(zmq.PAIR)
         self._zmq_socket.connect("tcp://localhost:5556")
+        # Requests triggered by received events are sent from a worker thread, thus
+        # receiving is not stalled by slow answers of the camera.
+        self._zmq_event_queue: collections.deque = collections.deque(maxlen=64)
+        self._zmq_event_cv = threading.Condition()
+        self._zmq_event_thd = threading.Thread(
+            target=self._zmq_event_worker_function, daemon=True
+        )
+        self._zmq_event_thd.start()
         self._zmq_thd = threading.Thread(
             target=self._zmq_consumer_function, daemon=True
         )
         self._zmq_thd.start()
 
+        # Serialization and sending of state changes is done in a separate thread to
+        # not delay requests to the camera. Pending messages of the same type in
+        # _COALESCED_PUBLISH_TYPES are replaced by the latest one.
+        self._pub_queue: collections.deque = collections.deque(maxlen=64)
+        self._pub_latest_by_type: Dict[str, Any] = {}
+        self._pub_cv = threading.Condition()
+        # backoff between attempts to send a message before it is dropped
+        self._pub_retry_delays: Tuple[float, ...] = (0.01, 0.02, 0.04)
+        self._pub_thd = threading.Thread(target=self._publisher_function, daemon=True)
+        self._pub_thd.start()
+
         if auto_connect:
             self.connect(host)
 
     def _publish_state_change(self, typ, data):
-        self._zmq_socket.send_pyobj({"type": typ, "data": data}, zmq.NOBLOCK)
+        with self._pub_cv:
+            if typ in _COALESCED_PUBLISH_TYPES and typ in self._pub_latest_by_type:
+                self._pub_latest_by_type[typ] = data
+                return
+
+            if len(self._pub_queue) == self._pub_queue.maxlen:
+                dropped_typ, _ = self._pub_queue.popleft()
+                self._pub_latest_by_type.pop(dropped_typ, None)
+                logger.warning("Publish queue full, dropped %s", dropped_typ)
+
+            if typ in _COALESCED_PUBLISH_TYPES:
+                self._pub_latest_by_type[typ] = data
+                self._pub_queue.append((typ, None))
+            else:
+                self._pub_queue.append((typ, data))
+            self._pub_cv.notify()
+
+    def _publisher_function(self):
+        while True:
+            with self._pub_cv:
+                while not self._pub_queue:
+                    self._pub_cv.wait()
+                typ, data = self._pub_queue.popleft()
+                if typ in _COALESCED_PUBLISH_TYPES:
+                    data = self._pub_latest_by_type.pop(typ)
+            try:
+                if typ in XML_PUBLISH_TYPES:
+                    data = xml.etree.ElementTree.tostring(data)
+                msg = {"type": typ, "data": data}
+                for delay in self._pub_retry_delays:
+                    try:
+                        self._zmq_socket.send_pyobj(msg, zmq.NOBLOCK)
+                        break
+                    except zmq.Again:
+                        # receiver is missing or slow, e.g. GUI still starting
+                        time.sleep(delay)
+                else:
+                    logger.debug("No receiver for published %s", typ)
+            except Exception as e:
+                logger.exception(e)
 
     def _zmq_consumer_function(self):
         while True:
             try:
                 event = self._zmq_socket.recv_pyobj()
-                logger.info("Received via zmq: %s", event)
-                if "capture" in event:
-                    self.capture()
-                elif "streamviewer_event" in event:
-                    event_type = event["streamviewer_event"]
-                    x = event["x"]
-                    y = event["y"]
-                    if event_type == "click":
-                        self.lcd_on()
-                        self.send_touch_coordinate(x, y)
+                with self._zmq_event_cv:
+                    # While dragging, events arrive faster than the camera takes them.
+                    # Only the newest of queued drag_continue events is of interest.
+                    if (
+                        self._zmq_event_queue
+                        and event.get("streamviewer_event") == "drag_continue"
+                        and self._zmq_event_queue[-1].get("streamviewer_event")
+                        == "drag_continue"
+                    ):
+                        self._zmq_event_queue[-1] = event
                     else:
-                        # 'drag_start', 'drag_continue', 'drag_stop'
-                        if event_type == "drag_start":
-                            self._last_drag_continue_timestamp = time.time()
-                        elif event_type == "drag_continue":
-                            if (
-                                time.time()
-                                > self._last_drag_continue_timestamp
-                                + self.min_drag_continue_interval
-                            ):
-                                self._last_drag_continue_timestamp = time.time()
-                            else:
-                                continue
-                        logger.info("Received via zmq: %s", event)
-                        value = event_type.split("_")[-1]
-                        self.lcd_on()
-                        self.send_touch_drag(value, x, y)
+                        if len(self._zmq_event_queue) == self._zmq_event_queue.maxlen:
+                            dropped = self._zmq_event_queue.popleft()
+                            logger.warning("Event queue full, dropped %s", dropped)
+                        self._zmq_event_queue.append(event)
+                    self._zmq_event_cv.notify()
+            except Exception as e:
+                logger.exception(e)
+
+    def _zmq_event_worker_function(self):
+        while True:
+            with self._zmq_event_cv:
+                while not self._zmq_event_queue:
+                    self._zmq_event_cv.wait()
+                event = self._zmq_event_queue.popleft()
+            try:
+                self._handle_zmq_event(event)
             except Exception as e:
                 logger.exception(e)
 
+    def _handle_zmq_event(self, event: Dict[str, Any]):
+        logger.info("Received via zmq: %s", event)
+        if "capture" in event:
+            self.capture()
+        elif "streamviewer_event" in event:
+            event_type = event["streamviewer_event"]
+            x = event["x"]
+            y = event["y"]
+            if event_type == "click":
+                self._lcd_on_before_touch()
+                self.send_touch_coordinate(x, y)
+            else:
+                # 'drag_start', 'drag_continue', 'drag_stop'
+                if event_type == "drag_start":
+                    self._last_drag_continue_ns = time.monotonic_ns()
+                elif event_type == "drag_continue":
+                    now = time.monotonic_ns()
+                    if now - self._last_drag_continue_ns < self._min_drag_continue_ns:
+                        return
+                    self._last_drag_continue_ns = now
+                logger.info("Received via zmq: %s", event)
+                value = _DRAG_VALUES[event_type]
+                self._lcd_on_before_touch()
+                self.send_touch_drag(value, x, y)
+
     def __str__(self):
         try:
             return (
@@ -415,9 +1036,7 @@ class LumixG9IIWiFiControl:
             if "X-SESSION_ID" not in args[0]._headers:
                 if not args[0]._auto_connect:
                     e = RuntimeError("Not connected to camera. Use connect() first")
-                    args[0]._zmq_socket.send_pyobj(
-                        {"type": "exception", "data": e}, zmq.NOBLOCK
-                    )
+                    args[0]._publish_state_change("exception", e)
                     raise e
                 else:
                     args[0].connect(args[0].host)
@@ -427,7 +1046,7 @@ class LumixG9IIWiFiControl:
 
     def _requires_not_busy(func):
         def _decorated(self, *args, **kwargs):
-            if self._cam_not_busy.isSet():
+            if self._cam_not_busy.is_set():
                 return func(self, *args, **kwargs)
             else:
                 logger.error("Cam is busy, ignoring command.")
@@ -439,13 +1058,13 @@ class LumixG9IIWiFiControl:
             if not args[0]._host:
                 if not args[0]._auto_connect:
                     e = RuntimeError("Not connected to camera. Use connect() first")
-                    args[0]._zmq_socket.send_pyobj(
-                        {"type": "exception", "data": e}, zmq.NOBLOCK
-                    )
+                    args[0]._publish_state_change("exception", e)
                     raise e
                 else:
                     logger.info("Camera hostname/IP not given. Searching for device")
-                    args[0].host = find_lumix_camera_via_sspd()
+                    args[0].host = find_lumix_camera_via_sspd(
+                        probe_session=args[0]._session
+                    )
             return func(*args, **kwargs)
 
         return _decorated
@@ -455,6 +1074,14 @@ class LumixG9IIWiFiControl:
         if self._http_server:
             return self._http_server.cached_properties
 
+    @property
+    def min_drag_continue_interval(self) -> float:
+        return self._min_drag_continue_ns / 1e9
+
+    @min_drag_continue_interval.setter
+    def min_drag_continue_interval(self, interval: float):
+        self._min_drag_continue_ns = int(interval * 1e9)
+
     @property
     def host(self):
         return self._host
@@ -464,6 +1091,35 @@ class LumixG9IIWiFiControl:
         self._host = host
         self._cam_cgi = f"http://{self._host}/cam.cgi"
 
+    def _get_cam_cgi(self, params: Dict[str, str]) -> requests.Response:
+        """
+        Send a request to the camera's cam.cgi. All commands are routed through here.
+        """
+        key = (self._cam_cgi, self._headers.get("X-SESSION_ID"))
+        template_key, template = self._cam_cgi_template
+        if template_key != key:
+            template = self._session.prepare_request(
+                requests.Request("GET", self._cam_cgi)
+            )
+            self._cam_cgi_template = (key, template)
+
+        # only the query differs between commands, thus skip merging of session
+        # settings and headers done by Session.get()
+        request = template.copy()
+        request.prepare_url(self._cam_cgi, params)
+        # body is read by _decode_return_value_from_camera(), which allows to parse
+        # XML while it is received
+        return self._session.send(request, stream=True)
+
+    def _camcmd(self, value: str) -> List[str]:
+        """
+        Send a "camcmd" command without further arguments, e.g. "capture".
+        """
+        ret = self._get_cam_cgi({"mode": "camcmd", "value": value})
+        ret = self._parse_return_value_from_camera(ret)
+        self._state_refresh_requested.set()
+        return ret
+
     def connect(self, host: str = None):
         """
         Parameters
@@ -473,22 +1129,26 @@ class LumixG9IIWiFiControl:
             If the device, where this program is running on and the camera are
             connected via the same router or accesspoint, the camera is accessible via
             the hostname "mlbel".
+            If None, the camera connected last time is tried first, otherwise the
+            single camera in the network is searched.
         """
         if self.host is None:
             if host is None:
                 logger.info("Camera hostname/IP not given. Searching for device")
-                host = find_lumix_camera_via_sspd()
-            else:
-                self.host = host
+                host = find_lumix_camera_via_sspd(probe_session=self._session)
+            # set before the requests below, which are sent from several threads
+            self.host = host
 
-        with self._request_lock:
-            self._get_device_info_via_ddd()
+        with (
+            self._request_lock,
+            concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor,
+        ):
+            # The device description is not cached, since in direct mode every camera
+            # is at 192.168.54.1. It is only needed to check the handshake, thus fetch
+            # it while the handshake is running.
+            ddd_future = executor.submit(self._get_device_info_via_ddd)
 
-            ret = requests.get(
-                self._cam_cgi,
-                headers=self._headers,
-                params={"mode": "accctrl", "type": "req_acc_g"},
-            )
+            ret = self._get_cam_cgi({"mode": "accctrl", "type": "req_acc_g"})
             req_acc_g_str = self._parse_return_value_from_camera(ret)[0]
 
             value, value2 = hash_wifi(req_acc_g_str)
@@ -499,49 +1159,55 @@ class LumixG9IIWiFiControl:
             # )
             # value2 = "2ebe8e72"
 
-            ret = requests.get(
-                self._cam_cgi,
-                headers=self._headers,
-                params={
-                    "mode": "accctrl",
-                    "type": "req_acc_e",
-                    "value": value,
-                    "value2": value2,
-                },
-            )
+            # camera expects req_acc_e twice, first is answered without and second
+            # with a session id. Send both concurrently to save one round-trip.
+            handshake_params = {
+                "mode": "accctrl",
+                "type": "req_acc_e",
+                "value": value,
+                "value2": value2,
+            }
+            futures = [
+                executor.submit(self._get_cam_cgi, handshake_params) for _ in range(2)
+            ]
+            rets = [future.result() for future in futures]
+            answers = _decode_concurrent_handshake(rets)
+            if answers is None:
+                # e.g. err_busy, or both requests were taken as the first one
+                logger.info("Concurrent handshake not accepted, falling back to serial")
+                for ret in rets:
+                    ret.close()
+                answers = []
+                for _ in range(2):
+                    data = self._parse_return_value_from_camera(
+                        self._get_cam_cgi(handshake_params)
+                    )
+                    answers.append(data)
+                    if len(data) == 4:
+                        # a concurrent request was already taken as the first one
+                        break
+
+            # answers without a session id are followed by one with it
+            if len(answers[-1]) != 4 or any(len(data) != 3 for data in answers[:-1]):
+                e = RuntimeError(f"Camera did not grant a session id: {answers}")
+                self._publish_state_change("exception", e)
+                raise e
 
-            self._assert_ret_ok(ret)
-            data = ret.text.strip().split(",")
-            assert (
-                data[1] == self.device_info_dict["friendlyName"]
-            ), f'{data}: {data[1]} != {self.device_info_dict["friendlyName"]}'
-            assert data[2] == "remote"
-            assert data[3] == "open"
-
-            ret = requests.get(
-                self._cam_cgi,
-                headers=self._headers,
-                params={
-                    "mode": "accctrl",
-                    "type": "req_acc_e",
-                    "value": value,
-                    "value2": value2,
-                },
-            )
-            data = self._parse_return_value_from_camera(ret)
-            assert data[0] == self.device_info_dict["friendlyName"]
-            assert data[1] == "remote"
-            assert data[2] == "open"
-            self._headers["X-SESSION_ID"] = data[3]
-
-            ret = requests.get(
-                self._cam_cgi,
-                headers=self._headers,
-                params={
+            ddd_future.result()
+            for data in answers:
+                assert (
+                    data[0] == self.device_info_dict["friendlyName"]
+                ), f'{data}: {data[0]} != {self.device_info_dict["friendlyName"]}'
+                assert data[1] == "remote"
+                assert data[2] == "open"
+            self._headers["X-SESSION_ID"] = answers[-1][3]
+
+            ret = self._get_cam_cgi(
+                {
                     "mode": "setsetting",
                     "type": "device_name",
                     "value": self.local_device_name,
-                },
+                }
             )
             self._parse_return_value_from_camera(ret)
 
@@ -551,26 +1217,68 @@ class LumixG9IIWiFiControl:
         )
         self._state_thread.start()
 
-        self._get_capability()
-        self._get_allmenu()
-        self.get_lens()
-        self.get_external_teleconverter()
-        self.get_touch_type()
-        self._get_curmenu()
-        self._subscribe_to_camera_events()
+        def query_menus():
+            # curmenu is applied to allmenu, thus keep the order
+            self._get_allmenu()
+            self._get_curmenu()
+
+        # remaining queries are independent, thus overlap their round-trip times
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(func)
+                for func in (
+                    query_menus,
+                    self._get_capability,
+                    self.get_lens,
+                    self.get_external_teleconverter,
+                    self.get_touch_type,
+                    self._subscribe_to_camera_events,
+                )
+            ]
+            for future in futures:
+                future.result()
+        # Settings are applied to allmenu and use a pool of their own. Running them
+        # after the other queries keeps connect() at `max_parallel_requests`
+        # concurrent requests, since more make the camera answer err_busy.
         self.get_settings()
         logger.info("Connected to %s", str(self))
 
     def disconnect(self):
         self._keepalive = False
+        # let the state thread stop now instead of after its current interval
+        self._state_refresh_requested.set()
+        with self._event_refresh_lock:
+            if self._event_refresh_timer is not None:
+                self._event_refresh_timer.cancel()
+                self._event_refresh_timer = None
+            self._pending_lens_refresh = False
+            self._pending_settings_refresh = False
+        self._lcd_on_until = 0
+        self._last_published_state = None
+        self._last_state_body = None
+        self._last_curmenu_body = None
+        # the local network might change until the next connect()
+        self._local_ip = (None, None)
+        self._session.close()
         self._host = None
         self._cam_cgi = None
         if "X-SESSION_ID" in self._headers:
             del self._headers["X-SESSION_ID"]
 
     def _get_state_thread(self):
+        next_deadline = time.monotonic() + self.state_poll_interval
         while self._keepalive:
-            time.sleep(2)
+            requested = self._state_refresh_requested.wait(
+                max(0, next_deadline - time.monotonic())
+            )
+            self._state_refresh_requested.clear()
+            if not self._keepalive:
+                break
+            next_deadline += self.state_poll_interval
+            if requested or next_deadline < time.monotonic():
+                # restart the interval after a requested poll, and skip polls missed
+                # due to a slow answer instead of catching up
+                next_deadline = time.monotonic() + self.state_poll_interval
             with self._request_lock:
                 try:
                     logger.debug(
@@ -580,17 +1288,30 @@ class LumixG9IIWiFiControl:
                     self.get_state()
                 except Exception as e:
                     logger.exception(e)
+                    self._last_state_body = None
                     self.camera_state_dict = {
                         "cammode": "no connection",
                         "error": traceback.format_exception_only(e),
                     }
-                    self._publish_state_change("state_dict", self.camera_state_dict)
+                    self._publish_camera_state()
+
+    def _publish_camera_state(self):
+        # state rarely changes between two polls, thus mainly publish changes
+        now = time.monotonic()
+        if (
+            self.camera_state_dict != self._last_published_state
+            or now - self._last_state_publish_time >= self.state_republish_interval
+        ):
+            self._last_published_state = self.camera_state_dict
+            self._last_state_publish_time = now
+            self._publish_state_change("state_dict", self.camera_state_dict)
 
     @_requires_host
     def _get_device_info_via_ddd(self):
-        ret = requests.get(f"http://{self._host}:60606/Lumix/Server0/ddd")
+        ret = self._session.get(f"http://{self._host}:60606/Lumix/Server0/ddd")
         self._assert_ret_ok(ret)
-        self._ddd_tree = defusedxml.ElementTree.fromstring(ret.text)
+        # device was found via SSDP and might not be a camera, thus parse defensively
+        self._ddd_tree = defusedxml.ElementTree.fromstring(ret.content)
         if self.store_queries:
             with open("ddd.xml", "wb") as f:
                 xml.etree.ElementTree.indent(self._ddd_tree)
@@ -611,18 +1332,15 @@ class LumixG9IIWiFiControl:
     @_requires_connected
     def run_camcgi_from_dict(self, d: CamCGISettingDict):
         params = {}
-        for key in get_type_hints(CamCGISettingDict).keys():
+        for key in _CAMCGI_KEYS:
             if f"cmd_{key}" in d:
                 params[key] = d[f"cmd_{key}"]
             if key in d:
                 params[key] = d[key]
         logger.info("cam_cgi_params: %s", params)
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params=params,
-        )
+        ret = self._get_cam_cgi(params)
         ret = self._parse_return_value_from_camera(ret)
+        self._state_refresh_requested.set()
 
         # read back since some parameters are accepted by camera without an error,
         # but internally adjusted, e.g., apterture can be set outside the region, the
@@ -637,11 +1355,7 @@ class LumixG9IIWiFiControl:
 
     @_requires_connected
     def _get_capability(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "getinfo", "type": "capability"},
-        )
+        ret = self._get_cam_cgi({"mode": "getinfo", "type": "capability"})
         self._capability_tree = self._parse_return_value_from_camera(ret)
 
         if self.store_queries:
@@ -655,12 +1369,9 @@ class LumixG9IIWiFiControl:
 
     @_requires_connected
     def _get_allmenu(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "getinfo", "type": "allmenu"},
-        )
+        ret = self._get_cam_cgi({"mode": "getinfo", "type": "allmenu"})
         self._allmenu_tree = self._parse_return_value_from_camera(ret)
+        self._setsetting_commands_cache = None
         if self.store_queries:
             with open("allmenu.xml", "wb") as f:
                 xml.etree.ElementTree.indent(self._allmenu_tree)
@@ -689,175 +1400,32 @@ class LumixG9IIWiFiControl:
         Thus add it manually.
         """
         menuset = self._allmenu_tree.find("menuset")
+        menuset.append(copy.deepcopy(_EXTRA_MENU_ELEMENT))
 
-        extra_menu = xml.etree.ElementTree.SubElement(menuset, "extra_menu")
-        menu = xml.etree.ElementTree.SubElement(extra_menu, "menu")
         language_en = self._allmenu_tree.find('menuset/titlelist/language[@code="en"]')
         # TODO: other languages
-
-        # add sd-card selection
-        item = xml.etree.ElementTree.SubElement(menu, "item")
-        item.set("id", "menu_item_id_sd")
-        item.set("title_id", "title_sdcard_select")
-        item.set("func_type", "select")
-        group = xml.etree.ElementTree.SubElement(item, "group")
-        title = xml.etree.ElementTree.SubElement(language_en, "title")
-        title.set("id", "title_sdcard_select")
-        title.text = "SD Card"
-        for i in (1, 2):
-            item = xml.etree.ElementTree.SubElement(group, "item")
-            title_id = f"title_sd_{i}"
-            item.set("id", f"menu_item_id_sd_{i}")
-            item.set("title_id", title_id)
-            item.set("cmd_mode", "setsetting")
-            item.set("cmd_type", "current_sd")
-            item.set("cmd_value", f"sd{i}")
-
-            title = xml.etree.ElementTree.SubElement(language_en, "title")
-            title.set("id", title_id)
-            title.text = f"SD Card {i}"
-
-        # add shutter speed
-        item = xml.etree.ElementTree.SubElement(menu, "item")
-        item.set("id", "menu_item_id_shtrspeed")
-        item.set("title_id", "Shutter Speed")
-        item.set("func_type", "select")
-        group = xml.etree.ElementTree.SubElement(item, "group")
-        for cmd_value, text in (
-            ("3840/256", "32000"),
-            ("3755/256", "25000"),
-            ("3670/256", "20000"),
-            ("3584/256", "16000"),
-            ("3499/256", "13000"),
-            ("3414/256", "10000"),
-            ("3328/256", "8000"),
-            ("3243/256", "6400"),
-            ("3158/256", "5000"),
-            ("3072/256", "4000"),
-            ("2987/256", "3200"),
-            ("2902/256", "2500"),
-            ("2816/256", "2000"),
-            ("2731/256", "1600"),
-            ("2646/256", "1300"),
-            ("2560/256", "1000"),
-            ("2475/256", "800"),
-            ("2390/256", "640"),
-            ("2304/256", "500"),
-            ("2219/256", "400"),
-            ("2134/256", "320"),
-            ("2048/256", "250"),
-            ("1963/256", "200"),
-            ("1878/256", "160"),
-            ("1792/256", "125"),
-            ("1707/256", "100"),
-            ("1622/256", "80"),
-            ("1536/256", "60"),
-            ("1451/256", "50"),
-            ("1366/256", "40"),
-            ("1280/256", "30"),
-            ("1195/256", "25"),
-            ("1110/256", "20"),
-            ("1024/256", "15"),
-            ("939/256", "13"),
-            ("854/256", "10"),
-            ("768/256", "8"),
-            ("683/256", "6"),
-            ("598/256", "5"),
-            ("512/256", "4"),
-            ("427/256", "3.2"),
-            ("342/256", "2.5"),
-            ("256/256", "2"),
-            ("171/256", "1.6"),
-            ("86/256", "1.3"),
-            ("0/256", "1"),
-            ("65451/256", "1.3s"),
-            ("65366/256", "1.6s"),
-            ("65280/256", "2s"),
-            ("65195/256", "2.5s"),
-            ("65110/256", "3.2s"),
-            ("65024/256", "4s"),
-            ("64939/256", "5s"),
-            ("64854/256", "6s"),
-            ("64768/256", "8s"),
-            ("64683/256", "10s"),
-            ("64598/256", "13s"),
-            ("64512/256", "15s"),
-            ("64427/256", "20s"),
-            ("64342/256", "25s"),
-            ("64256/256", "30s"),
-            ("64171/256", "40s"),
-            ("64086/256", "50s"),
-            ("64000/256", "60s"),
-            ("16384/256", "B"),
-        ):
-            item = xml.etree.ElementTree.SubElement(group, "item")
-            title_id = f"title_shtrspeed_{cmd_value}"
-            item.set("id", f"menu_item_id_shtrspeed_{cmd_value}")
-            item.set("title_id", title_id)
-            item.set("cmd_mode", "setsetting")
-            item.set("cmd_type", "shtrspeed")
-            item.set("cmd_value", cmd_value)
-
-            title = xml.etree.ElementTree.SubElement(language_en, "title")
-            title.set("id", title_id)
-            title.text = text
-
-        # add aperture
-        item = xml.etree.ElementTree.SubElement(menu, "item")
-        item.set("id", "menu_item_id_focal")
-        item.set("title_id", "Aperture")
-        item.set("func_type", "select")
-        group = xml.etree.ElementTree.SubElement(item, "group")
-        for cmd_value, text in (
-            ("164/256", "1.18"),
-            ("171/256", "1.2"),
-            ("256/256", "1.4"),
-            ("342/256", "1.6"),
-            ("392/256", "1.7"),
-            ("427/256", "1.8"),
-            ("512/256", "2"),
-            ("598/256", "2.2"),
-            ("683/256", "2.5"),
-            ("768/256", "2.8"),
-            ("854/256", "3.2"),
-            ("938/256", "3.5"),
-            ("1024/256", "4"),
-            ("1110/256", "4.5"),
-            ("1195/256", "5"),
-            ("1280/256", "5.6"),
-            ("1366/256", "6.3"),
-            ("1451/256", "7.1"),
-            ("1536/256", "8"),
-            ("1622/256", "9"),
-            ("1707/256", "10"),
-            ("1792/256", "11"),
-            ("1878/256", "13"),
-            ("1963/256", "14"),
-            ("2048/256", "16"),
-            ("2134/256", "18"),
-            ("2219/256", "20"),
-            ("2304/256", "22"),
-        ):
-            item = xml.etree.ElementTree.SubElement(group, "item")
-            title_id = f"title_focal_{cmd_value}"
-            item.set("id", f"menu_item_id_focal_{cmd_value}")
-            item.set("title_id", title_id)
-            item.set("cmd_mode", "setsetting")
-            item.set("cmd_type", "focal")
-            item.set("cmd_value", cmd_value)
-
-            title = xml.etree.ElementTree.SubElement(language_en, "title")
-            title.set("id", title_id)
-            title.text = text
+        language_en.extend(copy.deepcopy(_EXTRA_MENU_TITLES_EN))
 
     @_requires_connected
     def _get_curmenu(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "getinfo", "type": "curmenu"},
+        ret = self._get_cam_cgi({"mode": "getinfo", "type": "curmenu"})
+        # Items for sd cards are added from camera state. If neither changed, skip
+        # parsing and publishing the tree again.
+        sd_states = (
+            self.camera_state_dict.get("sd_memory"),
+            self.camera_state_dict.get("sd2_memory"),
+        )
+        if sd_states == self._last_curmenu_sd_states:
+            previous_body = self._last_curmenu_body
+        else:
+            previous_body = None
+        et, self._last_curmenu_body = self._parse_changed_return_value(
+            ret, previous_body
         )
-        self._curmenu_tree = self._parse_return_value_from_camera(ret)
+        if et is None:
+            return
+        self._curmenu_tree = et
+        self._last_curmenu_sd_states = sd_states
         menuinfo = self._curmenu_tree.find("menuinfo")
         for i, tag in zip((1, 2), ("", "2")):
             key = f"sd{tag}_memory"
@@ -889,37 +1457,51 @@ class LumixG9IIWiFiControl:
 
     @_requires_connected
     def get_state(self):
-        ret = requests.get(
-            self._cam_cgi, headers=self._headers, params={"mode": "getstate"}
+        ret = self._get_cam_cgi({"mode": "getstate"})
+        # state is polled periodically and rarely changes
+        et, self._last_state_body = self._parse_changed_return_value(
+            ret, self._last_state_body
         )
-        et = self._parse_return_value_from_camera(ret)
-
-        self.camera_state_dict = {}
-        for i in et.find("state"):
-            self.camera_state_dict[i.tag] = i.text
+        if et is not None:
+            self.camera_state_dict = {i.tag: i.text for i in et.find("state")}
 
-        self._publish_state_change("state_dict", self.camera_state_dict)
+        self._publish_camera_state()
         return self.camera_state_dict
 
     @_requires_connected
     def get_lens(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "getinfo", "type": "lens"},
-        )
+        ret = self._get_cam_cgi({"mode": "getinfo", "type": "lens"})
         data = self._parse_return_value_from_camera(ret)
         self._lens_data = data
+        (
+            current_aperture_limit,
+            minimum_mechanical_shutter_speed,
+            maximum_mechanical_shutter_speed,
+            _,
+            _,
+            _,
+            maximum_focal_length,
+            minmal_focal_length,
+            _,
+            _,
+            _,
+            _,
+            mount,
+            name,
+            manufactorer,
+            serial_number,
+            *_,
+        ) = data
         self.lens_dict = {
-            "current_aperture_limit": data[0],
-            "minimum_mechanical_shutter_speed": data[1],
-            "maximum_mechanical_shutter_speed": data[2],
-            "maximum_focal_length": data[6],
-            "minmal_focal_length": data[7],
-            "mount": data[12],
-            "name": data[13],
-            "manufactorer": data[14],
-            "serial_number": data[15],
+            "current_aperture_limit": current_aperture_limit,
+            "minimum_mechanical_shutter_speed": minimum_mechanical_shutter_speed,
+            "maximum_mechanical_shutter_speed": maximum_mechanical_shutter_speed,
+            "maximum_focal_length": maximum_focal_length,
+            "minmal_focal_length": minmal_focal_length,
+            "mount": mount,
+            "name": name,
+            "manufactorer": manufactorer,
+            "serial_number": serial_number,
         }
         self._publish_state_change("lens_dict", self.lens_dict)
         logger.info("Lens data: %s, Lens dict: %s", self._lens_data, self.lens_dict)
@@ -928,21 +1510,13 @@ class LumixG9IIWiFiControl:
 
     @_requires_connected
     def get_external_teleconverter(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "getsetting", "type": "ex_tele_conv"},
-        )
+        ret = self._get_cam_cgi({"mode": "getsetting", "type": "ex_tele_conv"})
         self._external_teleconverter_tree = self._parse_return_value_from_camera(ret)
         return self._external_teleconverter_tree
 
     @_requires_connected
     def get_touch_type(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "getsetting", "type": "touch_type"},
-        )
+        ret = self._get_cam_cgi({"mode": "getsetting", "type": "touch_type"})
         self.touch_type = self._parse_return_value_from_camera(ret)
         return self.touch_type
 
@@ -955,42 +1529,52 @@ class LumixG9IIWiFiControl:
             "value2": f"{x:d}/{y:d}",
         }
 
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params=params,
-        )
+        ret = self._get_cam_cgi(params)
         data = self._parse_return_value_from_camera(ret)
         logger.debug("drag %s move to coordinates %s", value, data)
         return data
 
     @_requires_connected
-    def send_touch_trace(self, coordinate_list: List[Tuple[int, int]]):
+    def send_touch_trace(
+        self, coordinate_list: List[Tuple[int, int]], interval: float = None
+    ):
         """
         Simulate moving one finger across the screen.
+
+        Parameters
+        ----------
+        coordinate_list:
+            Points of the trace, see `send_touch_coordinate()`.
+        interval:
+            If None, each point is sent as soon as the camera answered the previous
+            one, thus the trace is as fast as the connection allows.
+            Otherwise, points are sent every `interval` seconds. A point is never
+            sent before the previous one was answered, since the camera needs them
+            in order, thus a slow answer delays the following points.
         """
         assert len(coordinate_list) > 1
 
-        params = {"mode": "camctrl", "type": "touch_trace"}
-        for idx, coordinates in enumerate(coordinate_list):
-            if idx == 0:
-                params["value"] = "start"
-            elif idx == len(coordinate_list) - 1:
-                params["value"] = "stop"
-            else:
-                params["value"] = "continue"
-            params["value2"] = f"{coordinates[0]}/{coordinates[1]}"
+        values = ["start"] + ["continue"] * (len(coordinate_list) - 2) + ["stop"]
+        params_list = [
+            {
+                "mode": "camctrl",
+                "type": "touch_trace",
+                "value": value,
+                "value2": "%d/%d" % (x, y),
+            }
+            for value, (x, y) in zip(values, coordinate_list)
+        ]
 
-            ret = requests.get(
-                self._cam_cgi,
-                headers=self._headers,
-                params=params,
-            )
-            data = self._parse_return_value_from_camera(ret)
-            time.sleep(0.2)
+        t0 = time.monotonic()
+        for idx, params in enumerate(params_list):
+            if interval is not None:
+                delay = t0 + idx * interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            data = self._parse_return_value_from_camera(self._get_cam_cgi(params))
             # data is [0,0] for value start and stop
             # data is [557,469] representing the value that where actually set
-            if 0 < idx < len(coordinate_list):
+            if 0 < idx < len(coordinate_list) - 1:
                 logger.info("moved to coordinates %s", data)
 
     @_requires_connected
@@ -1011,15 +1595,13 @@ class LumixG9IIWiFiControl:
         It is not possible to touch the control elements on the right side with this
         function.
         """
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={
+        ret = self._get_cam_cgi(
+            {
                 "mode": "camctrl",
                 "type": "touch",
                 "value": f"{x:d}/{y:d}",
                 "value2": "on",
-            },
+            }
         )
         self._parse_return_value_from_camera(ret)
 
@@ -1034,72 +1616,50 @@ class LumixG9IIWiFiControl:
     @_requires_connected
     @_requires_not_busy
     def lcd_on(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "lcd_on"},
-        )
-        self._parse_return_value_from_camera(ret)
+        """
+        Switch on the camera's display.
+        """
+        now = time.monotonic()
+        self._lcd_on_until = 0
+        self._camcmd("lcd_on")
+        self._lcd_on_until = now + self.lcd_on_ttl
+
+    def _lcd_on_before_touch(self):
+        # touch events from the stream viewer come in quick succession, thus skip
+        # lcd_on within `lcd_on_ttl` seconds after a successful one
+        if time.monotonic() < self._lcd_on_until:
+            return
+        self.lcd_on()
 
     @_requires_connected
     @_requires_not_busy
     def menu_entry(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "menu_entry"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("menu_entry")
 
     @_requires_connected
     @_requires_not_busy
     def video_recstart(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "video_recstart"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("video_recstart")
 
     @_requires_connected
     @_requires_not_busy
     def video_recstop(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "video_recstop"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("video_recstop")
 
     @_requires_connected
     @_requires_not_busy
     def set_recmode(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "recmode"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("recmode")
 
     @_requires_connected
     @_requires_not_busy
     def set_playmode(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "playmode"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("playmode")
 
     @_requires_connected
     @_requires_not_busy
     def poweroff(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "poweroff"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("poweroff")
 
     @_requires_connected
     @_requires_not_busy
@@ -1111,11 +1671,7 @@ class LumixG9IIWiFiControl:
         # only works in recmode
         self.set_recmode()
 
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "startstream", "value": {port}},
-        )
+        ret = self._get_cam_cgi({"mode": "startstream", "value": port})
         self._parse_return_value_from_camera(ret)
 
         # TODO: stop stream when window is closed
@@ -1137,9 +1693,7 @@ class LumixG9IIWiFiControl:
     @_requires_connected
     @_requires_not_busy
     def stop_stream(self):
-        ret = requests.get(
-            self._cam_cgi, headers=self._headers, params={"mode": "stopstream"}
-        )
+        ret = self._get_cam_cgi({"mode": "stopstream"})
         self._parse_return_value_from_camera(ret)
 
     @_requires_connected
@@ -1149,11 +1703,7 @@ class LumixG9IIWiFiControl:
         Move focus in predefined steps.
         """
 
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camctrl", "type": "focus", "value": step},
-        )
+        ret = self._get_cam_cgi({"mode": "camctrl", "type": "focus", "value": step})
         data = self._parse_return_value_from_camera(ret)
         logger.info("Focus values: %s", data)
         # ok,564,1024,0,0,1024,1000/295,500/537,300/779,0/0,0/0,0/0,0/0
@@ -1162,31 +1712,19 @@ class LumixG9IIWiFiControl:
 
     @_requires_connected
     def capture(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "capture"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("capture")
 
     @_requires_connected
     def oneshot_af(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "oneshot_af"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("oneshot_af")
 
     @_requires_connected
     def touchcapt_ctrl(self, value):
         """
         value: Literal["enable", "disable", "off"]
         """
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camctrl", "type": "touchcapt_ctrl", "value": value},
+        ret = self._get_cam_cgi(
+            {"mode": "camctrl", "type": "touchcapt_ctrl", "value": value}
         )
         self._parse_return_value_from_camera(ret)
 
@@ -1204,10 +1742,8 @@ class LumixG9IIWiFiControl:
 
         """
         # TODO: when set to "on", Panasonic Lumix Sync also sends autoreviewunlock
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camctrl", "type": "touchae_ctrl", "value": value},
+        ret = self._get_cam_cgi(
+            {"mode": "camctrl", "type": "touchae_ctrl", "value": value}
         )
         self._parse_return_value_from_camera(ret)
 
@@ -1221,15 +1757,13 @@ class LumixG9IIWiFiControl:
         value: Union["current_auto", "pinp", "full", "off"]
         value2 : Union["mf_asst/0/0", "digital_scope/0/0"]
         """
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={
+        ret = self._get_cam_cgi(
+            {
                 "mode": "camctrl",
                 "type": "asst_disp",
                 "value": value,
                 "value2": value2,
-            },
+            }
         )
         try:
             data = self._parse_return_value_from_camera(ret)
@@ -1244,30 +1778,15 @@ class LumixG9IIWiFiControl:
     def capture_cancel(self):
         # TODO:: a long exposure cannot be canceld,
         # but maybe a series or stepmotion capture can be canceld
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "capture_cancel"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("capture_cancel")
 
     @_requires_connected
     def autoreviewunlock(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "autoreviewunlock"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("autoreviewunlock")
 
     @_requires_connected
     def touchrelease(self):
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "camcmd", "value": "touchrelease"},
-        )
-        self._parse_return_value_from_camera(ret)
+        self._camcmd("touchrelease")
 
     @_requires_connected
     def get_content_info(self):
@@ -1292,78 +1811,103 @@ class LumixG9IIWiFiControl:
 
 
         """
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "get_content_info"},
-        )
+        ret = self._get_cam_cgi({"mode": "get_content_info"})
         et: xml.etree.ElementTree.ElementTree = self._parse_return_value_from_camera(
             ret
         )
-        d = {}
-        for item in et:
-            if item.tag != "result":
-                d[item.tag] = int(item.text)
-        return d
+        return {item.tag: int(item.text) for item in et if item.tag != "result"}
 
-    def _parse_return_value_from_camera(
-        self, ret: requests.Response, N=0
-    ) -> Union[xml.etree.ElementTree.Element, List[str]]:
+    def _decode_return_value_from_camera(
+        self, ret: requests.Response
+    ) -> Tuple[str, Union[xml.etree.ElementTree.Element, List[str]]]:
+        """
+        Returns the state reported by the camera, e.g. "ok" or "err_busy", and the
+        parsed answer.
+        """
         self._assert_ret_ok(ret)
 
         assert (
             ret.headers["Server"] == "Panasonic"
         ), "header 'Server' is not 'Panasonic', maybe connected to wrong device"
 
-        if (
-            ret.headers["Content-Type"] == "text/xml"
-            or ret.headers["Content-Type"] == "xml"
-        ):
-            et = defusedxml.ElementTree.fromstring(ret.text)
-            state = et.find("result").text
-            if state == "ok":
-                return et
-        elif ret.headers["Content-Type"] == "text/plain":
-            data = ret.text.strip().split(",")
-            state = data[0]
-            if state == "ok":
-                return data[1:]
+        content_type = ret.headers.get("Content-Type")
+        if content_type in _XML_CONTENT_TYPES:
+            # Parse raw bytes, thus the parser takes the encoding from the XML
+            # declaration and requests does not need to guess and decode it. This
+            # matters for large documents like allmenu and capability.
+            et = _parse_xml_chunks(ret.iter_content(chunk_size=65536))
+            return et.find("result").text, et
+        elif content_type == "text/plain":
+            # like ret.text for text/plain without charset, but without the lookup
+            state, sep, rest = ret.content.decode("iso-8859-1").strip().partition(",")
+            return state, rest.split(",") if sep else []
         else:
-            e = RuntimeError(f'Unexpected content type {ret.headers["Content-Type"]}')
-            self._zmq_socket.send_pyobj({"type": "exception", "data": e}, zmq.NOBLOCK)
+            e = RuntimeError(f"Unexpected content type {content_type}")
+            self._publish_state_change("exception", e)
             raise e
 
-        if state == "err_busy" and N < self.number_retry_if_busy:
+    def _parse_changed_return_value(
+        self, ret: requests.Response, previous_body: bytes
+    ) -> Tuple[Union[xml.etree.ElementTree.Element, List[str], None], bytes]:
+        """
+        Like `_parse_return_value_from_camera()`, but returns None instead of parsing
+        an answer identical to `previous_body`.
+        Additionally returns the body of an "ok" answer for the next comparison.
+        """
+        body = ret.content if ret.ok else None
+        if body is not None and body == previous_body:
+            return None, body
+        state, result = self._decode_return_value_from_camera(ret)
+        if state != "ok":
+            # e.g. err_busy, which is retried or raised here
+            return self._parse_return_value_from_camera(ret), None
+        return result, body
+
+    def _parse_return_value_from_camera(
+        self, ret: requests.Response
+    ) -> Union[xml.etree.ElementTree.Element, List[str]]:
+        N = 0
+        while True:
+            state, result = self._decode_return_value_from_camera(ret)
+            if state == "ok":
+                return result
+            if state != "err_busy" or N >= self.number_retry_if_busy:
+                break
+
+            delay = self._busy_retry_delay(N)
             logger.warning(
-                f"{ret.url} is busy, auto-retry {N+1}/{self.number_retry_if_busy} in 1 second"
+                f"{ret.url} is busy, auto-retry {N+1}/{self.number_retry_if_busy} in {delay:.2f} seconds"
             )
-            time.sleep(self.retry_busy_interval)
-            ret2 = ret.connection.send(ret.request)
-            return self._parse_return_value_from_camera(ret2, N=N + 1)
+            time.sleep(delay)
+            ret = self._session.send(ret.request.copy(), stream=True)
+            N += 1
+
+        if state == "err_param":
+            e = ValueError(f"{ret.url} resulted in {state}")
+            self._publish_state_change("exception", e)
+            raise e
+        elif state == "err_reject":
+            e = KeyError(
+                f"{ret.url} resulted in {state}, "
+                "indicating that operation is not possible in current state of the camera"
+            )
+            self._publish_state_change("exception", e)
+            raise e
         else:
-            if state == "err_param":
-                e = ValueError(f"{ret.url} resulted in {state}")
-                self._zmq_socket.send_pyobj(
-                    {"type": "exception", "data": e}, zmq.NOBLOCK
-                )
-                raise e
-            elif state == "err_reject":
-                e = KeyError(
-                    f"{ret.url} resulted in {state}, "
-                    "indicating that operation is not possible in current state of the camera"
-                )
-                self._zmq_socket.send_pyobj(
-                    {"type": "exception", "data": e}, zmq.NOBLOCK
-                )
-                raise e
+            if xml.etree.ElementTree.iselement(result):
+                # streamed body was consumed by the parser
+                details = xml.etree.ElementTree.tostring(result, encoding="unicode")
             else:
-                e = RuntimeError(
-                    f"{ret.url} resulted in {state}. Full error: {ret.text}"
-                )
-                self._zmq_socket.send_pyobj(
-                    {"type": "exception", "data": e}, zmq.NOBLOCK
-                )
-                raise e
+                details = ret.text
+            e = RuntimeError(f"{ret.url} resulted in {state}. Full error: {details}")
+            self._publish_state_change("exception", e)
+            raise e
+
+    def _busy_retry_delay(self, n_retry: int) -> float:
+        # exponential backoff, jitter avoids concurrent requests retrying in sync
+        return min(
+            self.retry_busy_max_interval, self.retry_busy_interval * 2**n_retry
+        ) + random.uniform(0, self.retry_busy_jitter)
 
     def set_local_language(self, language_code=None):
         """
@@ -1378,7 +1922,13 @@ class LumixG9IIWiFiControl:
         self._language_tree = self._allmenu_tree.find(
             f"menuset/titlelist/language[@code='{language_code}']"
         )
-        if self._language_tree is None:
+        self._setsetting_commands_cache = None
+        self._title_map = {}
+        if self._language_tree is not None:
+            # first title wins, as with find()
+            for title in reversed(self._language_tree.findall("title")):
+                self._title_map[title.get("id")] = title.text
+        else:
             language_codes_available = [
                 child.attrib["code"]
                 for child in self._allmenu_tree.findall("./menuset/titlelist/language")
@@ -1395,11 +1945,7 @@ class LumixG9IIWiFiControl:
         to a human-readable from.
         """
 
-        item = self._language_tree.find(f"./title[@id='{title_id}']")
-        if item is not None:
-            return item.text
-        else:
-            return title_id
+        return self._title_map.get(title_id, title_id)
 
     def print_set_setting_commands(self):
         """
@@ -1410,29 +1956,51 @@ class LumixG9IIWiFiControl:
     def get_setsetting_commands(
         self,
     ) -> Dict[str, List[Union[Tuple[str,], Tuple[str, str]]]]:
+        """
+        Returns the settings, which can be changed via `set_setting()`, and their
+        options as listed in allmenu.xml.
+
+        Result is cached until allmenu or the local language changes.
+        """
+        if self._setsetting_commands_cache is not None:
+            return self._setsetting_commands_cache
+
+        # One depth-first walk over the menu. The group item of a cmd_type is the
+        # grandparent of its first item, which can have any cmd_mode.
+        group_items = {}
         data = {}
-        for item in self._allmenu_tree.findall("menuset//*[@cmd_mode='setsetting']"):
-            cmd_type = item.attrib["cmd_type"]
 
+        def walk(parent, grandparent):
+            for item in parent:
+                cmd_type = item.get("cmd_type")
+                if cmd_type is not None:
+                    if cmd_type not in group_items:
+                        group_items[cmd_type] = grandparent
+                    if item.get("cmd_mode") == "setsetting":
+                        add_option(cmd_type, item)
+                if len(item):
+                    walk(item, parent)
+
+        def add_option(cmd_type, item):
             if cmd_type not in data:
-                group_item = self._allmenu_tree.find(
-                    f"menuset//*[@cmd_type='{cmd_type}']/../.."
-                )
-                if "title_id" in group_item.attrib:
-                    group_title_id = group_item.attrib["title_id"]
+                group_title_id = group_items[cmd_type].get("title_id")
+                if group_title_id is not None:
                     name = self.get_localized_setting_name(group_title_id)
                 else:
                     name = None
                 data[cmd_type] = {"name": name, "options": []}
 
-            d = {"name": self.get_localized_setting_name(item.attrib["title_id"])}
-            if "cmd_value" in item.attrib:
-                d["cmd_value"] = item.attrib["cmd_value"]
-            if "cmd_value2" in item.attrib:
-                d["cmd_value2"] = item.attrib["cmd_value2"]
-
+            d = {"name": self.get_localized_setting_name(item.get("title_id"))}
+            if (cmd_value := item.get("cmd_value")) is not None:
+                d["cmd_value"] = cmd_value
+            if (cmd_value2 := item.get("cmd_value2")) is not None:
+                d["cmd_value2"] = cmd_value2
             data[cmd_type]["options"].append(d)
 
+        for menuset in self._allmenu_tree.iterfind("menuset"):
+            walk(menuset, self._allmenu_tree)
+
+        self._setsetting_commands_cache = data
         return data
 
     @_requires_connected
@@ -1458,25 +2026,19 @@ class LumixG9IIWiFiControl:
         params = {"mode": "setsetting", "type": setting, "value": value}
         if value2 is not None:
             params["value2"] = value2
-        ret = requests.get(self._cam_cgi, headers=self._headers, params=params)
+        ret = self._get_cam_cgi(params)
         self._parse_return_value_from_camera(ret)
 
     @_requires_connected
     def get_setting(self, setting) -> Dict[Literal["type", "value", "value2"], str]:
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "getsetting", "type": setting},
-        )
-        res: xml.etree.ElementTree.Element = self._parse_return_value_from_camera(ret)[
-            1
-        ]
+        ret = self._get_cam_cgi({"mode": "getsetting", "type": setting})
+        et = self._parse_return_value_from_camera(ret)
+        res: xml.etree.ElementTree.Element = et[1]
         data = {}
         if len(res.attrib) == 1:
-            data["type"] = list(res.attrib.keys())[0]
-            data["value"] = list(res.attrib.values())[0]
+            ((data["type"], data["value"]),) = res.attrib.items()
 
-            if text := self._parse_return_value_from_camera(ret)[1].text:
+            if text := res.text:
                 data["value2"] = text
         return data
 
@@ -1488,28 +2050,30 @@ class LumixG9IIWiFiControl:
     def get_settings(self, settings_list: List[str] = None) -> List[Dict[str, str]]:
         data = []
 
-        write_only_settings = [
-            "liveviewsize",
-            "recmode",
-            "videoquality_filter",
-            "photostyle",
-        ]
         if settings_list is None:
-            settings_list = list(self.get_setsetting_commands().keys())
-            settings_not_in_get_set_settings = [
-                "play_sort_mode",
-                "qmenu_disp_style",
-                "photostyle2",
-                "current_sd",
-            ]
-
-            "play_sort_mode can be file_no or date"
-            settings_list.extend(settings_not_in_get_set_settings)
-
-        for setsetting_cmd in settings_list:
-            if setsetting_cmd not in write_only_settings:
+            commands = self.get_setsetting_commands()
+            if self._default_settings_cache[0] is not commands:
+                # commands were rebuilt, e.g. after allmenu or language changed
+                self._default_settings_cache = (
+                    commands,
+                    tuple(
+                        s
+                        for s in (*commands, *_SETTINGS_NOT_IN_SETSETTING_COMMANDS)
+                        if s not in _WRITE_ONLY_SETTINGS
+                    ),
+                )
+            settings_list = self._default_settings_cache[1]
+        else:
+            settings_list = [s for s in settings_list if s not in _WRITE_ONLY_SETTINGS]
+
+        # requests are independent, thus overlap their round-trip times
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_parallel_requests
+        ) as executor:
+            futures = [executor.submit(self.get_setting, s) for s in settings_list]
+            for setsetting_cmd, future in zip(settings_list, futures):
                 try:
-                    data.append(self.get_setting(setsetting_cmd))
+                    data.append(future.result())
                 except RuntimeError:
                     logger.error("Could not read %s", setsetting_cmd)
 
@@ -1520,36 +2084,54 @@ class LumixG9IIWiFiControl:
         data = self.get_settings()
         pprint.pprint(data)
 
+    def _get_local_ip(self) -> str:
+        # lookup may involve DNS, thus it is only repeated when the camera changes
+        if self._local_ip[0] != self._host:
+            self._local_ip = (self._host, get_local_ip())
+        return self._local_ip[1]
+
     @_requires_host
     def _subscribe_to_camera_events(self):
+        if self._event_thread is None or not self._event_thread.is_alive():
+            self._event_thread = threading.Thread(
+                target=self._run_event_capture_server_blocking,
+                args=(49153,),
+                daemon=True,
+            )
+            self._event_thread.start()
+        # Subscribe once the server is listening, thus no event is lost. A failed
+        # subscription fails connect(), thus it is retried by the next connect().
+        if not self._event_server_ready.wait(self.event_server_start_timeout):
+            e = RuntimeError("Server for camera events did not start")
+            self._publish_state_change("exception", e)
+            raise e
+        # a later connect() can reach another camera at the same address
+        self._http_server.expected_UDN = self.device_info_dict["UDN"]
+        self._http_server.expected_remote_host = self._host
+        self._send_event_subscription()
+
+    @_requires_host
+    def _send_event_subscription(self):
         request = requests.Request(
             method="SUBSCRIBE",
             url=f"http://{self._host}:60606/Server0/CMS_event",
             headers={
                 "User-Agent": "Panasonic Android/1 DM-CP",
-                "CALLBACK": f"<http://{get_local_ip()}:49153/Camera/event>",
+                "CALLBACK": f"<http://{self._get_local_ip()}:49153/Camera/event>",
                 "NT": "upnp:event",
                 "TIMOEUT": "Second-300",
             },
         )
         prepared_request = request.prepare()
-        session = requests.Session()
-        ret = session.send(prepared_request)
+        ret = self._session.send(prepared_request)
         self._assert_ret_ok(ret)
 
-        if self._event_thread is None:
-            self._event_thread = threading.Thread(
-                target=self._run_event_capture_server_blocking,
-                args=(49153,),
-                daemon=True,
-            )
-            self._event_thread.start()
-
     def _assert_ret_ok(self, ret: requests.Response):
         if not ret.ok:
+            ret.close()
             logger.error("Request %s failed with %s", ret.url, ret.reason)
             e = RuntimeError(f"Request {ret.url}, failed with {ret.reason}")
-            self._zmq_socket.send_pyobj({"type": "exception", "data": e}, zmq.NOBLOCK)
+            self._publish_state_change("exception", e)
             raise e
 
     @_requires_connected
@@ -1558,20 +2140,14 @@ class LumixG9IIWiFiControl:
             value = "enable"
         else:
             value = "disable"
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "setsetting", "type": "raw_img_send", "value": value},
+        ret = self._get_cam_cgi(
+            {"mode": "setsetting", "type": "raw_img_send", "value": value}
         )
         self._parse_return_value_from_camera(ret)
 
     def get_capability(self):
         # TODO analyze whats in there (it is the same in rec and play mode)
-        ret = requests.get(
-            self._cam_cgi,
-            headers=self._headers,
-            params={"mode": "getinfo", "type": "capability"},
-        )
+        ret = self._get_cam_cgi({"mode": "getinfo", "type": "capability"})
         return self._parse_return_value_from_camera(ret)
 
     def _camera_event_callback(self, data: Tuple[str, str]):
@@ -1623,13 +2199,45 @@ class LumixG9IIWiFiControl:
                 self._cam_not_busy.set()
 
             if data[1].startswith("lens_"):
-                self.get_lens()
+                self._schedule_event_refresh(lens=True)
             if data[1] == "update":
-                self._get_curmenu()
-                self.get_settings()
+                self._schedule_event_refresh(settings=True)
         # TODO: make a more meaningful callback that calls get_lens on lens changes
         # and curmenu on mode changes and locks sending event while busy is active
 
+    def _schedule_event_refresh(self, lens: bool = False, settings: bool = False):
+        with self._event_refresh_lock:
+            self._pending_lens_refresh |= lens
+            self._pending_settings_refresh |= settings
+            if self._event_refresh_timer is not None:
+                self._event_refresh_timer.cancel()
+            self._event_refresh_timer = threading.Timer(
+                self.event_refresh_delay, self._run_event_refresh
+            )
+            self._event_refresh_timer.daemon = True
+            self._event_refresh_timer.start()
+
+    def _run_event_refresh(self):
+        with self._event_refresh_lock:
+            self._event_refresh_timer = None
+            if not self._cam_not_busy.is_set():
+                # camera is operated manually, requests would only be answered with
+                # err_busy. It sends update or lens_* when done, which reschedules.
+                return
+            lens = self._pending_lens_refresh
+            settings = self._pending_settings_refresh
+            self._pending_lens_refresh = False
+            self._pending_settings_refresh = False
+
+        try:
+            if lens:
+                self.get_lens()
+            if settings:
+                self._get_curmenu()
+                self.get_settings()
+        except Exception as e:
+            logger.exception(e)
+
     @_requires_host
     def _run_event_capture_server_blocking(self, port):
 
@@ -1641,13 +2249,46 @@ class LumixG9IIWiFiControl:
             expected_remote_host=self._host,
         )
         with self._http_server as httpd:
-            httpd.serve_forever()
+            self._event_server_ready.set()
+            try:
+                httpd.serve_forever()
+            finally:
+                self._event_server_ready.clear()
 
     @_requires_connected
     def query_all_items_on_sdcard(
         self,
         **kwargs: Unpack[CameraRequestFilterDict],
     ) -> List[Union[didl_lite.Item, didl_lite.Container]]:
+        """
+        Like `iter_all_items_on_sdcard()`, but returns all items at once.
+        """
+        item_list = list(self.iter_all_items_on_sdcard(**kwargs))
+
+        # if kwargs.get('age_in_days') is None and kwargs.get("rating_list") is None:
+        #     # TODO: When using filtering, camera reports bogus directories
+        #     # Each image in a Burst is reported then as a directory and the directories
+        #     # content the whole sd-card content.
+        #     for didl_object in didl_object_list:
+        #         if isinstance(didl_object, didl_lite.Container):
+        #             ret = self.query_all_items_on_sdcard(object_id_str = didl_object.id, **kwargs)
+        #             item_list.extend(ret)
+
+        return item_list
+
+    @_requires_connected
+    def iter_all_items_on_sdcard(
+        self,
+        **kwargs: Unpack[CameraRequestFilterDict],
+    ) -> Iterator[Union[didl_lite.Item, didl_lite.Container]]:
+        """
+        Yield the items on the sd-card page by page.
+
+        Pages are requested concurrently ahead of consumption, but only
+        `max_parallel_cds_requests` of them, thus stopping the iteration early saves
+        the requests for the remaining pages. A failed page is retried like a busy
+        answer of cam.cgi.
+        """
 
         logger.info("query_all_items_on_sdcard: %s", kwargs)
 
@@ -1661,36 +2302,43 @@ class LumixG9IIWiFiControl:
         # logger.info('play_sort_mode: %s', self.get_setting('play_sort_mode'))
 
         n_bulk = 15
-        TotalMatches = float("inf")
-        TotalNumberReturned = 0
-        item_list = []
-        i = 0
-        while TotalNumberReturned < TotalMatches:
-            logger.info(
-                "Item query %d/%s with filter %s",
-                TotalNumberReturned,
-                TotalMatches,
-                kwargs,
-            )
+
+        def query_page(i: int, retry: bool = True):
+            logger.info("Item query page %d with filter %s", i, kwargs)
 
             if self.store_queries:
                 log_key = f"{kwargs.get('object_id_str')}_{i}"
             else:
                 log_key = None
-            (
-                soap_xml,
-                didl_lite_xml,
-                didl_object_list,
-                TotalMatches,
-                NumberReturned,
-            ) = self.query_items_on_sdcard(
-                StartingIndex=i * n_bulk,
-                RequestedCount=n_bulk,
-                log_key=log_key,
-                **kwargs,
-            )
+            N = 0
+            while True:
+                try:
+                    result = self.query_items_on_sdcard(
+                        auto_set_play_mode=False,
+                        StartingIndex=i * n_bulk,
+                        RequestedCount=n_bulk,
+                        log_key=log_key,
+                        **kwargs,
+                    )
+                    break
+                except (RuntimeError, requests.RequestException) as e:
+                    # concurrent queries can make the camera refuse one of them
+                    if not retry or N >= self.number_retry_if_busy:
+                        raise
+                    delay = self._busy_retry_delay(N)
+                    logger.warning(
+                        "Item query page %d failed, auto-retry %d/%d in %.2f seconds: %s",
+                        i,
+                        N + 1,
+                        self.number_retry_if_busy,
+                        delay,
+                        e,
+                    )
+                    time.sleep(delay)
+                    N += 1
 
             if log_key is not None:
+                soap_xml, didl_lite_xml = result[:2]
                 xml.etree.ElementTree.indent(soap_xml)
                 with open(f"soap_{log_key}.xml", "wb") as f:
                     f.write(
@@ -1706,21 +2354,39 @@ class LumixG9IIWiFiControl:
                             didl_lite_xml, **self._xml_tostring_kwargs
                         )
                     )
-
-            i = i + 1
-            TotalNumberReturned = TotalNumberReturned + NumberReturned
-            item_list.extend(didl_object_list)
-
-        # if kwargs.get('age_in_days') is None and kwargs.get("rating_list") is None:
-        #     # TODO: When using filtering, camera reports bogus directories
-        #     # Each image in a Burst is reported then as a directory and the directories
-        #     # content the whole sd-card content.
-        #     for didl_object in didl_object_list:
-        #         if isinstance(didl_object, didl_lite.Container):
-        #             ret = self.query_all_items_on_sdcard(object_id_str = didl_object.id, **kwargs)
-        #             item_list.extend(ret)
-
-        return item_list
+            return result
+
+        # First page tells the total number of items. Remaining pages are
+        # independent of each other, thus request them concurrently. The first page
+        # is sent alone, thus an error is not caused by concurrency, e.g. a wrong
+        # filter, and it is not retried.
+        _, _, didl_object_list, TotalMatches, _ = query_page(0, retry=False)
+        n_items = len(didl_object_list)
+        yield from didl_object_list
+
+        n_pages = math.ceil(TotalMatches / n_bulk)
+        next_page = 1
+        futures: Deque[concurrent.futures.Future] = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_parallel_cds_requests
+        ) as executor:
+            try:
+                while futures or next_page < n_pages:
+                    # keep the pool busy, results are taken in page order
+                    while (
+                        next_page < n_pages
+                        and len(futures) < self.max_parallel_cds_requests
+                    ):
+                        futures.append(executor.submit(query_page, next_page))
+                        next_page += 1
+                    didl_object_list = futures.popleft().result()[2]
+                    n_items += len(didl_object_list)
+                    yield from didl_object_list
+            finally:
+                # iteration stopped early, drop pages that were not requested yet
+                for future in futures:
+                    future.cancel()
+        logger.info("Got %d/%d items", n_items, TotalMatches)
 
     @_requires_connected
     def query_items_on_sdcard(
@@ -1746,10 +2412,11 @@ class LumixG9IIWiFiControl:
             with open(f"cds_query_{log_key}.xml", "wb") as f:
                 f.write(xml_string)
 
-        ret = requests.post(url=url, headers=headers, data=xml_string)
+        ret = self._session.post(url=url, headers=headers, data=xml_string, stream=True)
 
         if ret.ok:
-            return decode_cds_query_response(ret.text)
+            soap_xml = _parse_xml_chunks(ret.iter_content(chunk_size=32768))
+            return decode_cds_query_response(soap_xml)
         else:
             # TODO when camera started in play mode,
             # this error occurs until switching to recmode and back to play mode
@@ -1772,12 +2439,31 @@ class LumixG9IIWiFiControl:
 
     @_requires_connected
     def get_content_item(
-        self, string, to_file: bool = False
-    ) -> Tuple[Dict[str, str], bytes]:
-        # string is like DL01112176.JPG
-        # DT01112176.JPG
-        ret = requests.get(f"http://{self.host}/{string}", headers=self._headers)
-        self._assert_ret_ok(ret)
+        self, string, to_file: bool = False, chunk_size: int = 1 << 20
+    ) -> Tuple[Dict[str, str], Union[bytes, None]]:
+        """
+        Download a file from the camera.
+
+        Parameters
+        ----------
+        string:
+            Name of the item on the camera, e.g. DL01112176.JPG or DT01112176.JPG
+        to_file:
+            If True, the content is written chunk-wise to a file of the same name in
+            the current working directory and not kept in memory. Returned content
+            is then None.
+        chunk_size:
+            Number of bytes read from the connection and written to the file at once,
+            if `to_file` is True.
+        """
+        with self._session.get(f"http://{self.host}/{string}", stream=True) as ret:
+            self._assert_ret_ok(ret)
+            if to_file:
+                with open(string, "wb") as f:
+                    for chunk in ret.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                return ret.headers, None
+            content = ret.content
 
         # TODO: Header looks like this
         # HTTP/1.1 200 OK'
@@ -1794,7 +2480,4 @@ class LumixG9IIWiFiControl:
         # X-FILE_SIZE: 5107
         # Connection: Keep-Alive'
 
-        if to_file:
-            with open(string, "b") as f:
-                f.write(ret.raw)
-        return ret.headers, ret.raw
+        return ret.headers, content
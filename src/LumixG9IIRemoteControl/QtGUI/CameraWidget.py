@@ -23,6 +23,7 @@ from qtpy.QtWidgets import (
 import LumixG9IIRemoteControl.LumixG9IIBluetoothControl
 import LumixG9IIRemoteControl.LumixG9IIWiFiControl
 from LumixG9IIRemoteControl.LumixG9IIWiFiControl import (
+    XML_PUBLISH_TYPES,
     didl_object_list_to_camera_content_list,
     find_lumix_camera_via_sspd,
     find_lumix_cameras_via_sspd,
@@ -61,6 +62,9 @@ class ZMQReceiver(QtCore.QObject):
         consumer_receiver.bind("tcp://*:5556")
         while True:
             obj = consumer_receiver.recv_pyobj()
+            if obj.get("type") in XML_PUBLISH_TYPES:
+                # parse here to keep it out of the GUI thread
+                obj["data"] = xml.etree.ElementTree.fromstring(obj["data"])
             self.dataChanged.emit(obj)
 
 
@@ -1,3 +1,4 @@
+import os
 import socket
 
 from PIL import Image, ImageDraw, ImageFont, ImageTk
@@ -22,6 +23,18 @@ def get_local_ip() -> str:
     return local_ip
 
 
+def get_cache_dir() -> str:
+    """
+    Directory for data which is kept between sessions, e.g. device descriptions.
+    """
+    cache_dir = os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "LumixG9IIRemoteControl",
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
 def get_waiting_for_stream_image() -> Image:
     image = Image.new("RGB", (640, 480), color="magenta")
     draw = ImageDraw.Draw(image)